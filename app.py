@@ -1,103 +1,151 @@
 import streamlit as st
 from pipeline import PolyglotPipeline, PythonVersionPipeline, AIOverviewAgent
 import zipfile
-import tempfile
 import os
-import shutil
-from io import BytesIO
-import difflib
+import asyncio
+import hashlib
+import tempfile
+import diskcache
+from diff_match_patch import diff_match_patch
 
 st.set_page_config(page_title="Polyglot Code Translator 🌐", layout="wide")
 st.title("Polyglot Code Translator 🌐")
 
 # --- Helper for ZIP processing ---
-def process_zip_files(uploaded_zip, processor, file_ext_map):
-    translated_zip_io = BytesIO()
-    with tempfile.TemporaryDirectory() as extract_dir, tempfile.TemporaryDirectory() as output_dir:
-        with zipfile.ZipFile(uploaded_zip, "r") as zip_ref:
-            zip_ref.extractall(extract_dir)
-
-        for root, _, files in os.walk(extract_dir):
-            for filename in files:
-                src_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(src_path, extract_dir)
-
-                if filename.endswith(".py"):
-                    base_name = os.path.splitext(rel_path)[0]
-                    new_ext = file_ext_map
-                    rel_path = base_name + new_ext
-
-                dest_path = os.path.join(output_dir, rel_path)
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-
-                if filename.endswith(".py"):
-                    try:
-                        with open(src_path, "r", encoding="utf-8") as f:
-                            code = f.read()
-                        translated, _ = processor.run(code)
-                        with open(dest_path, "w", encoding="utf-8") as f_out:
-                            f_out.write(translated)
-                    except Exception as e:
-                        st.warning(f"Failed to process `{rel_path}`: {e}")
-                        shutil.copyfile(src_path, dest_path)
-                else:
-                    shutil.copyfile(src_path, dest_path)
+ZIP_TRANSLATE_WORKERS = int(os.getenv("ZIP_TRANSLATE_WORKERS", "8"))
+
+async def _translate_members(members, processor):
+    """Translate (index, code) pairs with a bounded pool of queue workers."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    for item in members:
+        queue.put_nowait(item)
+
+    results = {}
+
+    async def worker():
+        while not queue.empty():
+            index, code = queue.get_nowait()
+            try:
+                translated, _ = await loop.run_in_executor(None, processor.run, code)
+                results[index] = (translated, None)
+            except Exception as e:
+                results[index] = (None, e)
+
+    workers = [asyncio.create_task(worker()) for _ in range(ZIP_TRANSLATE_WORKERS)]
+    await asyncio.gather(*workers)
+    return results
+
+# Members that are already compressed — deflating them again wastes CPU
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".pyc",
+    ".zip", ".gz", ".bz2", ".xz", ".7z", ".jar", ".whl",
+}
+
+def process_zip_files(uploaded_zip, processor, file_ext_map, compress_level=1):
+    # Stream members straight from the uploaded archive into the output
+    # archive — no tempdir extraction, so peak memory is one member at a time.
+    # Translations fan out across a bounded worker pool since processor.run
+    # is dominated by API latency. The output archive spools to disk past
+    # 32 MB so RAM stays bounded regardless of archive size.
+    translated_zip_io = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    with zipfile.ZipFile(uploaded_zip, "r") as zip_ref, \
+         zipfile.ZipFile(translated_zip_io, "w", zipfile.ZIP_DEFLATED, compresslevel=compress_level) as out_zip:
+        py_members = []
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                continue
+            if info.filename.endswith(".py"):
+                try:
+                    with zip_ref.open(info) as fh:
+                        code = fh.read().decode("utf-8")
+                except Exception as e:
+                    # Same warn-and-pass-through as failed translations
+                    st.warning(f"Failed to process `{info.filename}`: {e}")
+                    out_zip.writestr(info, zip_ref.read(info))
+                    continue
+                py_members.append((info, code))
+            else:
+                # Pass non-Python members through, keeping their ZipInfo
+                # metadata. Read before touching compress_type — ZipFile.read
+                # picks its decompressor from the ZipInfo.
+                data = zip_ref.read(info)
+                if os.path.splitext(info.filename)[1].lower() in STORED_EXTENSIONS:
+                    info.compress_type = zipfile.ZIP_STORED
+                out_zip.writestr(info, data)
 
-        with zipfile.ZipFile(translated_zip_io, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(output_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, output_dir)
-                    zipf.write(file_path, arcname)
+        results = asyncio.run(
+            _translate_members([(i, code) for i, (_, code) in enumerate(py_members)], processor)
+        )
+
+        for i, (info, _) in enumerate(py_members):
+            translated, error = results[i]
+            if error is not None:
+                st.warning(f"Failed to process `{info.filename}`: {error}")
+                out_zip.writestr(info, zip_ref.read(info))
+            else:
+                arcname = os.path.splitext(info.filename)[0] + file_ext_map
+                out_zip.writestr(arcname, translated.encode("utf-8"))
 
     translated_zip_io.seek(0)
     return translated_zip_io
 
 # --- Helper for pastel diff highlighting ---
 def generate_diff_html(original, modified):
-    differ = difflib.HtmlDiff(wrapcolumn=80)
-    html_diff = differ.make_table(
-        original.splitlines(),
-        modified.splitlines(),
-        fromdesc="Original",
-        todesc="Modified",
-        context=True,
-        numlines=3
-    )
+    # diff-match-patch (Myers' diff) stays fast on multi-hundred-KB inputs
+    # where difflib.HtmlDiff would stall for seconds.
+    dmp = diff_match_patch()
+    dmp.Diff_Timeout = 1.0
+    diffs = dmp.diff_main(original, modified)
+    dmp.diff_cleanupSemantic(diffs)
+    html_diff = dmp.diff_prettyHtml(diffs)
+
+    # Remap the inline-styled ins/del tags onto the pastel classes, and drop
+    # the pilcrow prettyHtml appends to every line break
+    html_diff = html_diff.replace(
+        '<ins style="background:#e6ffe6;">', '<ins class="diff_add">'
+    ).replace(
+        '<del style="background:#ffe6e6;">', '<del class="diff_sub">'
+    ).replace('&para;<br>', '<br>')
+
     pastel_css = """
     <style>
-    table.diff {
+    .diff_wrap {
         font-family: monospace;
-        border-collapse: collapse;
+        white-space: pre-wrap;
         width: 100%;
     }
-    .diff_header {
-        background-color: #fdf6e3; /* soft beige */
-        color: #444444;            /* dark gray text for readability */
-        padding: 5px;
-    }
-    td.diff_header {
-        text-align: right;
-    }
-    .diff_next {
-        background-color: #eee8d5; /* light tan for separator lines */
-    }
-    .diff_add {
+    .diff_add, ins.diff_add {
         background-color: #d4f4dd; /* pastel green */
         color: #1a3a1a;             /* dark green text */
+        text-decoration: none;
     }
-    .diff_chg {
-        background-color: #fff5e6; /* pastel orange */
-        color: #5a3d1a;            /* dark orange-brown text */
-    }
-    .diff_sub {
+    .diff_sub, del.diff_sub {
         background-color: #fce4e4; /* pastel pink/red */
         color: #5a1a1a;            /* dark red text */
+        text-decoration: none;
     }
     </style>
     """
 
-    return pastel_css + html_diff
+    return pastel_css + f'<div class="diff_wrap">{html_diff}</div>'
+
+# --- Cached wrappers so Streamlit reruns don't redo the diff or LLM call ---
+_overview_disk_cache = diskcache.Cache("./.llm_cache")
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_diff(original, modified):
+    return generate_diff_html(original, modified)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_overview(original, modified):
+    # Also persist on disk so restarting the app doesn't lose the cache
+    key = hashlib.blake2b((original + "\x00" + modified).encode("utf-8")).hexdigest()
+    report = _overview_disk_cache.get(key)
+    if report is None:
+        report = AIOverviewAgent().generate_report(original, modified)
+        _overview_disk_cache.set(key, report)
+    return report
 
 # === Mode Selection ===
 mode = st.radio(
@@ -131,6 +179,12 @@ elif not uploaded:
 
 # === Process ZIP Upload ===
 if uploaded and uploaded.name.endswith(".zip"):
+    zip_size_mode = st.radio(
+        "Output ZIP compression:",
+        ["Fast (larger file)", "Small (slower)"],
+        horizontal=True,
+        key="zip_compression"
+    )
     if st.button("Run 🚀", key="run_zip"):
         with st.spinner("Processing all Python files in ZIP..."):
             try:
@@ -141,11 +195,14 @@ if uploaded and uploaded.name.endswith(".zip"):
                     processor = PythonVersionPipeline(python_version_target)
                     ext_map = ".py"
 
-                translated_zip = process_zip_files(uploaded, processor, ext_map)
+                compress_level = 9 if zip_size_mode.startswith("Small") else 1
+                translated_zip = process_zip_files(uploaded, processor, ext_map, compress_level=compress_level)
                 st.success("Processing complete! Download your ZIP below.")
+                # download_button doesn't accept a SpooledTemporaryFile, so
+                # hand it the contents
                 st.download_button(
                     label="📦 Download Processed ZIP",
-                    data=translated_zip,
+                    data=translated_zip.read(),
                     file_name=f"processed_{uploaded.name}",
                     mime="application/zip"
                 )
@@ -172,7 +229,7 @@ elif code_input.strip() and st.button("Run 🚀", key="run_code"):
 
             # --- Show pastel diff ---
             st.subheader("Code Differences (Pastel Highlighting)")
-            diff_html = generate_diff_html(code_input, result)
+            diff_html = _cached_diff(code_input, result)
             st.markdown(diff_html, unsafe_allow_html=True)
 
             st.success("Processing complete!")
@@ -192,8 +249,7 @@ elif code_input.strip() and st.button("Run 🚀", key="run_code"):
 
             # AI Overview
             st.subheader("AI Overview Report")
-            overview_agent = AIOverviewAgent()
-            report = overview_agent.generate_report(code_input, result)
+            report = _cached_overview(code_input, result)
             st.markdown(report)
 
         except Exception as e:
@@ -1,26 +1,102 @@
 import ast
-import networkx as nx
-from typing import List
+import tiktoken
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
 
-# === 1. Build dependency graph ===
-class DependencyGraphBuilder(ast.NodeVisitor):
-    def __init__(self):
-        self.graph = nx.DiGraph()
-        self.current_function = None
+MAX_TOKENS = 3800
+
+_encoding: Optional[tiktoken.Encoding] = None
 
-    def visit_FunctionDef(self, node):
-        self.current_function = node.name
-        self.graph.add_node(node.name)
-        self.generic_visit(node)
+def _get_encoding() -> tiktoken.Encoding:
+    # Loaded lazily — encoding_for_model fetches the BPE table on first use.
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+    return _encoding
 
-    def visit_Call(self, node):
-        if isinstance(node.func, ast.Name) and self.current_function:
-            self.graph.add_edge(self.current_function, node.func.id)
-        self.generic_visit(node)
+def count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text))
+
+# === 1. Build dependency graph ===
+def build_call_graph(tree: ast.AST) -> Tuple[Set[str], Dict[str, Set[str]]]:
+    """Collect function names and caller→callee edges in one iterative walk.
+
+    Plain sets/dicts instead of NodeVisitor's per-node getattr dispatch and
+    recursion — the generic visitor overhead dominates on large files.
+    """
+    nodes: Set[str] = set()
+    edges: Dict[str, Set[str]] = defaultdict(set)
+    stack = [(child, None) for child in ast.iter_child_nodes(tree)]
+    while stack:
+        node, current = stack.pop()
+        node_type = type(node)
+        if node_type is ast.FunctionDef:
+            nodes.add(node.name)
+            current = node.name
+        elif node_type is ast.Call and current and isinstance(node.func, ast.Name):
+            nodes.add(node.func.id)
+            edges[current].add(node.func.id)
+        stack.extend((child, current) for child in ast.iter_child_nodes(node))
+    return nodes, edges
+
+def tarjan_scc(nodes: Set[str], edges: Dict[str, Set[str]]) -> List[Set[str]]:
+    """Iterative Tarjan's strongly connected components over plain dicts.
+
+    The call graphs here are tiny (<1000 nodes), where networkx's generic
+    graph protocol costs far more than the algorithm itself.
+    """
+    counter = 0
+    index: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    sccs: List[Set[str]] = []
+
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+
+        while work:
+            v, neighbours = work[-1]
+            descended = False
+            for w in neighbours:
+                if w not in index:
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(edges.get(w, ()))))
+                    descended = True
+                    break
+                if w in on_stack:
+                    lowlink[v] = min(lowlink[v], index[w])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[v])
+            if lowlink[v] == index[v]:
+                scc = set()
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    scc.add(w)
+                    if w == v:
+                        break
+                sccs.append(scc)
+
+    return sccs
 
 # === 2. Split large functions at control flow blocks ===
-def split_large_function(node: ast.FunctionDef, source: str, max_lines: int = 50) -> List[str]:
-    code = ast.get_source_segment(source, node)
+def split_large_function(node: ast.FunctionDef, segments: Dict[ast.AST, str], max_lines: int = 50) -> List[str]:
+    code = segments[node]
     lines = code.splitlines()
     if len(lines) <= max_lines:
         return [code]
@@ -35,79 +111,112 @@ def split_large_function(node: ast.FunctionDef, source: str, max_lines: int = 50
         chunks.append("\n".join(buffer))
     return chunks
 
+def split_large_chunk_by_token(chunk: str, max_tokens: int = MAX_TOKENS) -> List[str]:
+    enc = _get_encoding()
+    small_chunks = []
+    buffer, buffer_tokens = [], 0
+
+    for line in chunk.splitlines():
+        line_tokens = len(enc.encode(line + "\n"))
+        if buffer_tokens + line_tokens > max_tokens and buffer:
+            small_chunks.append("\n".join(buffer))
+            buffer = [line]
+            buffer_tokens = line_tokens
+        else:
+            buffer.append(line)
+            buffer_tokens += line_tokens
+
+    if buffer:
+        small_chunks.append("\n".join(buffer))
+    return small_chunks
+
 # === 3. Extract connected function groups ===
-def chunk_code(source: str) -> List[str]:
+def chunk_code(source: str) -> List[Tuple[str, Optional[ast.Module]]]:
+    """Split source into (chunk_text, chunk_ast) pairs.
+
+    The AST is built from the already-parsed top-level nodes so consumers
+    analyzing the source chunk itself never reparse; it describes the
+    source text only, not any translation of it. It is None for chunks
+    produced by line-level splitting, which may not parse on their own.
+    """
     tree = ast.parse(source)
-    builder = DependencyGraphBuilder()
-    builder.visit(tree)
-    graph = builder.graph
+    nodes, edges = build_call_graph(tree)
+
+    # Slice each top-level node's source once; ast.get_source_segment
+    # re-splits the whole source on every call.
+    source_lines = source.splitlines(keepends=True)
+    segments = {
+        node: "".join(source_lines[node.lineno - 1:node.end_lineno])
+        for node in tree.body
+    }
 
     # Map name → node
     func_nodes = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
 
     # Group by strongly connected components (functions that reference each other)
-    clusters = list(nx.strongly_connected_components(graph))
+    clusters = tarjan_scc(nodes, edges)
     chunks = []
 
     for cluster in clusters:
-        full_code = ""
+        parts = []
         for func_name in cluster:
             node = func_nodes.get(func_name)
             if node:
-                full_code += ast.get_source_segment(source, node) + "\n\n"
+                parts.append(segments[node])
+                parts.append("\n\n")
+        full_code = "".join(parts)
 
-        if len(full_code.splitlines()) > 100:
-            # Split cluster into smaller chunks
+        if count_tokens(full_code) > MAX_TOKENS:
+            # Split cluster into smaller chunks — line-level fragments
+            # carry no AST of their own
             for func_name in cluster:
                 node = func_nodes.get(func_name)
                 if node:
-                    chunks.extend(split_large_function(node, source))
+                    chunks.extend((frag, None) for frag in split_large_function(node, segments))
         else:
-            chunks.append(full_code.strip())
+            cluster_nodes = [func_nodes[name] for name in cluster if name in func_nodes]
+            chunks.append((full_code.strip(), cluster_nodes))
 
     # Handle global (non-function) code
-    global_code = ""
+    global_parts = []
+    global_nodes = []
     for node in tree.body:
         if not isinstance(node, ast.FunctionDef):
-            global_code += ast.get_source_segment(source, node) + "\n\n"
+            global_parts.append(segments[node])
+            global_parts.append("\n\n")
+            global_nodes.append(node)
+    global_code = "".join(global_parts)
 
     if global_code.strip():
-        chunks.insert(0, global_code.strip())  # Add to beginning
+        chunks.insert(0, (global_code.strip(), global_nodes))  # Add to beginning
 
     # Fallback
     if not chunks:
-        chunks = [source.strip()]
-
-    # --- New: Split chunks that exceed token limit ---
-    MAX_TOKENS = 4000
-    APPROX_CHARS_PER_TOKEN = 4  # Approximate chars per token
-
-    def split_large_chunk_by_token(chunk: str, max_tokens=MAX_TOKENS):
-        max_chars = max_tokens * APPROX_CHARS_PER_TOKEN
-        lines = chunk.splitlines()
-        small_chunks = []
-        buffer = []
-        buffer_len = 0
-
-        for line in lines:
-            line_len = len(line) + 1  # Include newline
-            if buffer_len + line_len > max_chars and buffer:
-                small_chunks.append("\n".join(buffer))
-                buffer = [line]
-                buffer_len = line_len
-            else:
-                buffer.append(line)
-                buffer_len += line_len
-
-        if buffer:
-            small_chunks.append("\n".join(buffer))
-        return small_chunks
+        chunks = [(source.strip(), list(tree.body))]
 
+    # --- Split chunks that exceed the token limit, measured exactly ---
     final_chunks = []
-    for c in chunks:
-        if len(c) > MAX_TOKENS * APPROX_CHARS_PER_TOKEN:
-            final_chunks.extend(split_large_chunk_by_token(c))
+    for c, c_nodes in chunks:
+        if count_tokens(c) > MAX_TOKENS:
+            final_chunks.extend((frag, None) for frag in split_large_chunk_by_token(c))
         else:
-            final_chunks.append(c)
+            final_chunks.append((c, c_nodes))
+
+    # --- Greedily pack small neighbouring chunks into one request ---
+    packed_chunks = []
+    buffer, buffer_nodes, buffer_tokens = [], [], 0
+    for c, c_nodes in final_chunks:
+        c_tokens = count_tokens(c)
+        if buffer and buffer_tokens + c_tokens > MAX_TOKENS:
+            packed_chunks.append(("\n\n".join(buffer), buffer_nodes))
+            buffer, buffer_nodes, buffer_tokens = [], [], 0
+        buffer.append(c)
+        buffer_nodes = buffer_nodes + c_nodes if buffer_nodes is not None and c_nodes is not None else None
+        buffer_tokens += c_tokens
+    if buffer:
+        packed_chunks.append(("\n\n".join(buffer), buffer_nodes))
 
-    return final_chunks
+    return [
+        (text, ast.Module(body=chunk_nodes, type_ignores=[]) if chunk_nodes is not None else None)
+        for text, chunk_nodes in packed_chunks
+    ]
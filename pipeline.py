@@ -6,10 +6,15 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from services.lint_service import LintService
 from chunk_code import chunk_code
 from services.execution_service import ExecutionService
-import concurrent.futures
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
+# Shared pool for blocking lint/exec subprocess work — creating a fresh
+# executor per .run() costs milliseconds of thread spawning each time.
+_POOL = ThreadPoolExecutor(max_workers=8)
+
 PROMPT_TEMPLATES = {
     'r': """
 # Convert the following Python code to R, ignore prompts with no code
@@ -60,34 +65,69 @@ class PolyglotPipeline:
         )
         return wrapped
 
+    async def _translate_chunk(self, chunk: str, semaphore: asyncio.Semaphore) -> dict:
+        if not chunk.strip():
+            return {"code": "", "exec": None}
+        try:
+            async with semaphore:
+                response = await self.chain.ainvoke({"source_chunk": chunk})
+            translated = response["text"].strip()
+
+            loop = asyncio.get_running_loop()
+            linted = await loop.run_in_executor(
+                _POOL, LintService.validate_and_fix, translated, self.target
+            )
+
+            if self.target == "java":
+                # Execution happens in one batched javac pass after all
+                # chunks are collected — see run()
+                return {"code": self.wrap_java_code(linted), "exec": None}
+
+            # The is-runnable check must judge the translated code, so let
+            # execute_code parse it — one ast.parse is noise next to the
+            # LLM round-trip it gates
+            exec_result = await loop.run_in_executor(
+                _POOL, ExecutionService.execute_code, linted, self.target
+            )
+            return {"code": linted, "exec": exec_result}
+        except Exception as e:
+            return {
+                "code": f"# Failed to translate chunk:\n# {e}\n\n{chunk}",
+                "exec": {"success": False, "output": "", "error": str(e)}
+            }
+
+    async def _translate_all(self, chunks: list[tuple[str, object]]) -> list[dict]:
+        # Issue every chunk translation concurrently; the semaphore keeps us
+        # under the API rate limit. Results are consumed as they complete and
+        # slotted back by index, so one slow chunk (e.g. an LLM timeout)
+        # never holds up handling of the fast ones.
+        semaphore = asyncio.Semaphore(10)
+
+        async def indexed(i: int, chunk: str) -> tuple[int, dict]:
+            return i, await self._translate_chunk(chunk, semaphore)
+
+        tasks = [asyncio.ensure_future(indexed(i, c)) for i, (c, _) in enumerate(chunks)]
+        results: list[dict | None] = [None] * len(chunks)
+        for fut in asyncio.as_completed(tasks):
+            i, result = await fut
+            results[i] = result
+        return results
+
     def run(self, source: str) -> tuple[str, list[dict]]:
         chunks = chunk_code(source)
-
-        def translate_chunk(chunk):
-            if not chunk.strip():
-                return {"code": "", "exec": None}
-            try:
-                translated = self.chain.run({
-                    "source_chunk": chunk
-                }).strip()
-
-                linted = LintService.validate_and_fix(translated, self.target)
-
-                if self.target == "java":
-                    linted = self.wrap_java_code(linted)
-
-                exec_result = ExecutionService.execute_code(linted, self.target)
-                return {"code": linted, "exec": exec_result}
-            except Exception as e:
-                return {
-                    "code": f"# Failed to translate chunk:\n# {e}\n\n{chunk}",
-                    "exec": {"success": False, "output": "", "error": str(e)}
-                }
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            results = list(executor.map(translate_chunk, chunks))
-
-        full_code = "\n\n".join(r["code"] for r in results)
+        results = asyncio.run(self._translate_all(chunks))
+
+        if self.target == "java":
+            # Compile every chunk in a single javac invocation instead of
+            # one JVM launch each
+            pending = [i for i, r in enumerate(results) if r["exec"] is None]
+            exec_results = ExecutionService.execute_batch(
+                [results[i]["code"] for i in pending], "java"
+            )
+            for i, exec_result in zip(pending, exec_results):
+                results[i]["exec"] = exec_result
+
+        full_code = "\n\n".join([r["code"] for r in results])
         return full_code, [r["exec"] for r in results]
 
 
@@ -118,7 +158,7 @@ class PythonVersionPipeline:
         chunks = chunk_code(source)
         results = []
 
-        for chunk in chunks:
+        for chunk, _ in chunks:
             if not chunk.strip():
                 results.append({"code": "", "exec": None})
                 continue
@@ -133,7 +173,7 @@ class PythonVersionPipeline:
                     "exec": {"success": False, "output": "", "error": str(e)}
                 })
 
-        full_code = "\n\n".join(r["code"] for r in results)
+        full_code = "\n\n".join([r["code"] for r in results])
         return full_code, [r["exec"] for r in results]
 
 
@@ -1,17 +1,224 @@
+import ast
+import re
 import subprocess
 import tempfile
 import os
 import shutil
+import threading
+
+# Resolve tool paths once at import instead of re-scanning PATH per call
+_JAVAC_PATH = shutil.which("javac")
+_JAVA_PATH = shutil.which("java")
+_JSHELL_PATH = shutil.which("jshell")
+
+_JAVA_MAIN_RE = re.compile(r"public\s+static\s+void\s+main\b")
+
+# Python statement types that only define things rather than run them
+_DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom)
 
 class ExecutionService:
+    # One warm jshell process shared across calls — full javac + java JVM
+    # startup costs ~300-600 ms per snippet otherwise.
+    _jshell_proc = None
+    _jshell_lock = threading.Lock()
+
+    @classmethod
+    def _get_jshell(cls):
+        if not _JSHELL_PATH:
+            return None
+        if cls._jshell_proc is None or cls._jshell_proc.poll() is not None:
+            # concise, not silent: silent mode suppresses compile/runtime
+            # diagnostics entirely, which would make failing snippets look
+            # successful
+            cls._jshell_proc = subprocess.Popen(
+                [_JSHELL_PATH, "--feedback=concise"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+        return cls._jshell_proc
+
+    @classmethod
+    def _run_java_snippet(cls, code_str: str, timeout: int = 10) -> dict | None:
+        """Run a Java chunk on the warm jshell. Returns None to signal the
+        caller to fall back to the javac+java path."""
+        sentinel = "__EXEC_DONE__"
+        with cls._jshell_lock:
+            proc = cls._get_jshell()
+            if proc is None:
+                return None
+            try:
+                proc.stdin.write(code_str + "\n")
+                proc.stdin.write("TranslatedProgram.main(new String[]{});\n")
+                proc.stdin.write(f'System.out.println("{sentinel}");\n')
+                proc.stdin.flush()
+
+                # Drain stdout on a thread — readline() is buffered, so
+                # selecting on the raw fd would block after one read drains
+                # a whole output burst into the TextIOWrapper
+                lines = []
+                pipe_closed = threading.Event()
+
+                def _drain():
+                    while True:
+                        line = proc.stdout.readline()
+                        if not line:
+                            pipe_closed.set()
+                            return
+                        if line.strip() == sentinel:
+                            return
+                        lines.append(line)
+
+                reader = threading.Thread(target=_drain, daemon=True)
+                reader.start()
+                reader.join(timeout)
+
+                if reader.is_alive():
+                    # Snippet hung — kill the process so the next call gets
+                    # a fresh jshell
+                    proc.kill()
+                    cls._jshell_proc = None
+                    reader.join(1)
+                    return {"success": False, "output": "", "error": "Execution timed out."}
+
+                if pipe_closed.is_set():
+                    cls._jshell_proc = None
+                    return None
+
+                diagnostics = [l for l in lines if l.startswith("|  ")]
+                output = "".join(l for l in lines if not l.startswith("|  ")).strip()
+                return {
+                    "success": not diagnostics,
+                    "output": output,
+                    "error": "".join(diagnostics).strip()
+                }
+            except Exception:
+                cls._jshell_proc = None
+                return None
+
+    @staticmethod
+    def _is_runnable(code_str: str, target_lang: str, tree: ast.Module | None = None) -> bool:
+        """Cheap static check for an executable entry point, so pure
+        definition chunks don't pay an interpreter/JVM launch. A caller may
+        pass a pre-parsed tree only if it parses to the same code_str —
+        otherwise the check would judge different code than what runs."""
+        if target_lang in ("python", "pyspark"):
+            if tree is None:
+                try:
+                    tree = ast.parse(code_str)
+                except SyntaxError:
+                    return True  # let the interpreter report the error
+            return any(not isinstance(node, _DEFINITION_NODES) for node in tree.body)
+        if target_lang == "java":
+            return bool(_JAVA_MAIN_RE.search(code_str))
+        return True
+
+    @staticmethod
+    def _skipped_result() -> dict:
+        return {"success": True, "output": "(definitions only, not executed)", "error": ""}
+
+    @staticmethod
+    def execute_batch(codes: list[str], target_lang: str = "java") -> list[dict | None]:
+        """Execute many chunks at once, amortizing compiler startup for Java.
+
+        For Java, all chunks are compiled in a single javac invocation
+        (classes renamed TranslatedProgram_{i} to avoid collisions) instead
+        of paying a JVM launch per chunk. Other languages just delegate to
+        execute_code per chunk. Empty chunks map to None, matching the
+        per-chunk pipeline convention.
+        """
+        results: list[dict | None] = [None] * len(codes)
+        indexed = [(i, c) for i, c in enumerate(codes) if c.strip()]
+        if not indexed:
+            return results
+
+        if target_lang != "java":
+            for i, code in indexed:
+                results[i] = ExecutionService.execute_code(code, target_lang)
+            return results
+
+        runnable = []
+        for i, code in indexed:
+            if ExecutionService._is_runnable(code, "java"):
+                runnable.append((i, code))
+            else:
+                results[i] = ExecutionService._skipped_result()
+        indexed = runnable
+        if not indexed:
+            return results
+
+        if not _JAVAC_PATH or not _JAVA_PATH:
+            # execute_code may still have a warm jshell available
+            for i, code in indexed:
+                results[i] = ExecutionService.execute_code(code, "java")
+            return results
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filepaths = []
+            for i, code in indexed:
+                class_name = f"TranslatedProgram_{i}"
+                filepath = os.path.join(temp_dir, class_name + ".java")
+                with open(filepath, "w", encoding="utf-8") as f:
+                    f.write(code.replace("TranslatedProgram", class_name))
+                filepaths.append(filepath)
+
+            try:
+                compile_proc = subprocess.run(
+                    [_JAVAC_PATH] + filepaths,
+                    capture_output=True,
+                    text=True,
+                    timeout=60
+                )
+            except subprocess.TimeoutExpired:
+                compile_proc = None
+
+            if compile_proc is None or compile_proc.returncode != 0:
+                # One bad chunk fails the whole invocation — retry per chunk
+                # so each gets its own diagnostics
+                for i, code in indexed:
+                    results[i] = ExecutionService.execute_code(code, "java")
+                return results
+
+            for i, _ in indexed:
+                result = {"success": False, "output": "", "error": ""}
+                try:
+                    run_proc = subprocess.run(
+                        [_JAVA_PATH, "-cp", temp_dir, f"TranslatedProgram_{i}"],
+                        capture_output=True,
+                        text=True,
+                        timeout=10
+                    )
+                    result["success"] = run_proc.returncode == 0
+                    result["output"] = run_proc.stdout.strip()
+                    result["error"] = run_proc.stderr.strip()
+                except subprocess.TimeoutExpired:
+                    result["error"] = "Execution timed out."
+                except Exception as e:
+                    result["error"] = str(e)
+                results[i] = result
+
+        return results
+
     @staticmethod
-    def execute_code(code_str: str, target_lang: str) -> dict:
+    def execute_code(code_str: str, target_lang: str, tree: ast.Module | None = None) -> dict:
         suffix_map = {'r': '.R', 'java': '.java', 'python': '.py'}
         suffix = suffix_map.get(target_lang, '.txt')
 
         result = {"success": False, "output": "", "error": ""}
 
+        if not ExecutionService._is_runnable(code_str, target_lang, tree):
+            return ExecutionService._skipped_result()
+
         if target_lang == "java":
+            jshell_result = ExecutionService._run_java_snippet(code_str)
+            if jshell_result is not None:
+                return jshell_result
+
+            if not _JAVAC_PATH or not _JAVA_PATH:
+                result["error"] = "javac/java not found on PATH."
+                return result
             # Create temp directory for java file + class file
             with tempfile.TemporaryDirectory() as temp_dir:
                 java_filename = "TranslatedProgram.java"
@@ -22,7 +229,7 @@ class ExecutionService:
                 try:
                     # Compile java file
                     compile_proc = subprocess.run(
-                        ["javac", java_filepath],
+                        [_JAVAC_PATH, java_filepath],
                         capture_output=True,
                         text=True,
                         timeout=10
@@ -34,7 +241,7 @@ class ExecutionService:
 
                     # Run java class TranslatedProgram
                     run_proc = subprocess.run(
-                        ["java", "-cp", temp_dir, "TranslatedProgram"],
+                        [_JAVA_PATH, "-cp", temp_dir, "TranslatedProgram"],
                         capture_output=True,
                         text=True,
                         timeout=10
@@ -1,29 +1,76 @@
 import subprocess
 import tempfile
+import hashlib
 import os
+import threading
+
+# Formatted-output cache keyed on a digest of the code — repeated chunks
+# (boilerplate imports and the like) skip the formatter subprocess entirely.
+# validate_and_fix runs concurrently on the pipeline's thread pool, so all
+# cache access goes through the lock.
+_FMT_CACHE: dict[tuple[bytes, str], str] = {}
+_FMT_CACHE_MAX = 512
+_FMT_CACHE_LOCK = threading.Lock()
 
 class LintService:
     @staticmethod
     def validate_and_fix(code_str: str, target_lang: str) -> str:
-        suffix_map = {'r': '.R', 'java': '.java', 'python': '.py'}
-        formatter_cmd = {
-            'r': ['Rscript', '-e', f"styler::style_file('{'{file}'}')"],
-            'java': ['google-java-format', '-i'],
-            'python': ['black']
+        key = (hashlib.blake2b(code_str.encode('utf-8'), digest_size=16).digest(), target_lang)
+        with _FMT_CACHE_LOCK:
+            cached = _FMT_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        formatted = LintService._format(code_str, target_lang)
+
+        with _FMT_CACHE_LOCK:
+            if len(_FMT_CACHE) >= _FMT_CACHE_MAX:
+                _FMT_CACHE.pop(next(iter(_FMT_CACHE)), None)
+            _FMT_CACHE[key] = formatted
+        return formatted
+
+    @staticmethod
+    def _format(code_str: str, target_lang: str) -> str:
+        # black and google-java-format both read stdin / write stdout when
+        # given "-", so only R's styler still needs a temp file on disk.
+        stdin_cmd = {
+            'java': ['google-java-format', '-'],
+            'python': ['black', '-']
         }
-        suffix = suffix_map.get(target_lang, '.txt')
-        cmd = formatter_cmd.get(target_lang)
-        tf = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        tf.write(code_str.encode('utf-8'))
-        tf.close()
-        formatted = code_str
+        cmd = stdin_cmd.get(target_lang)
         if cmd:
             try:
-                full_cmd = cmd + ([tf.name] if target_lang == 'java' else [tf.name])
-                subprocess.run(full_cmd, check=True)
-                with open(tf.name) as f:
-                    formatted = f.read()
+                proc = subprocess.run(
+                    cmd,
+                    input=code_str,
+                    capture_output=True,
+                    text=True,
+                    timeout=10
+                )
+                return proc.stdout if proc.returncode == 0 else code_str
             except Exception:
-                formatted = code_str
-        os.unlink(tf.name)
-        return formatted
\ No newline at end of file
+                return code_str
+
+        if target_lang == 'r':
+            tf = tempfile.NamedTemporaryFile(delete=False, suffix='.R')
+            try:
+                tf.write(code_str.encode('utf-8'))
+                tf.close()
+                proc = subprocess.run(
+                    ['Rscript', '-e', f"styler::style_file('{tf.name}')"],
+                    capture_output=True,
+                    timeout=30
+                )
+                if proc.returncode == 0:
+                    with open(tf.name) as f:
+                        return f.read()
+                return code_str
+            except Exception:
+                return code_str
+            finally:
+                try:
+                    os.unlink(tf.name)
+                except Exception:
+                    pass
+
+        return code_str